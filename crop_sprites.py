@@ -2,54 +2,476 @@
 """
 Sprite Cropping Tool for RPG Game
 Automatically removes transparent/empty pixels around sprites to improve alignment and reduce file size.
+
+Optional: install numba (pip install numba) for a faster alpha scan of very large sprites when
+--alpha-threshold > 0, numpy (pip install numpy) for --tile, and numpy + pypng (pip install pypng)
+for --stream.
 """
 
 import os
 import sys
-from PIL import Image, ImageChops
+import json
+import struct
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
+# Bounding boxes from earlier runs, so unchanged sprites are not decoded again
+CACHE_FILE = '.sprite_crop_cache.json'
+
+# Per-file status lines are written to stdout in batches of this size
+OUTPUT_BATCH_SIZE = 256
+
+# Pillow is required, but main() reports a missing install instead of failing on import
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# numpy, numba and pypng are optional - without numba the threshold path falls back to Pillow,
+# without numpy --tile is unavailable, and --stream needs numpy + pypng.
+# numba is only imported once a sprite is large enough to use it (see _load_bbox_kernel),
+# because its import and first compile cost more than it saves on ordinary sprites.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import png
+except ImportError:
+    png = None
+
+# Sprites with fewer alpha pixels than this are scanned by Pillow even when numba is installed
+NUMBA_MIN_PIXELS = 4096 * 4096
+
+# SWAR constants: the low 7 bits and the high bit of each byte in a uint64
+_ONES = 0x0101010101010101
+if np is not None:
+    _LOW7 = np.uint64(0x7F7F7F7F7F7F7F7F)
+    _HIGH = np.uint64(0x8080808080808080)
+
+def _swar_params(thr):
+    """
+    Precompute the addend for _visible_bytes for a threshold in [0, 255).
+    For thr < 128, (b & 0x7F) + (127 - thr) overflows into the high bit exactly when
+    the low bits exceed thr, and bytes >= 128 are always visible (OR with b).
+    For thr >= 128 a byte needs its high bit set AND low bits > thr - 128 (AND with b).
+    Neither sum exceeds 254, so there is never a carry into the neighbouring byte.
+    """
+    if thr < 128:
+        return np.uint64((127 - thr) * _ONES), False
+    return np.uint64((255 - thr) * _ONES), True
+
+def _visible_bytes(word, add, high):
+    """Set the high bit of every byte of word whose value is > thr (see _swar_params)."""
+    low = (word & _LOW7) + add
+    if high:
+        return low & word & _HIGH
+    return (low | word) & _HIGH
+
+def _bbox_scan(alpha, words, thr, add, high):
+    """
+    Scan a 2D uint8 alpha plane for pixels with alpha > thr (compiled by _load_bbox_kernel).
+    alpha must be zero-padded to a multiple of 8 columns and words must be its uint64
+    view, so each step tests 8 pixels at once; only a word with a hit is rescanned
+    byte by byte.
+    Works inwards from the borders and stops at the first visible pixel:
+    top/bottom walk rows from each edge, then each row in between is
+    scanned from both sides for left/right.
+    Returns (left, top, right, bottom); top is -1 if no pixel is visible.
+    """
+    height, width = alpha.shape
+    word_count = words.shape[1]
+    
+    top = -1
+    for y in range(height):
+        for k in range(word_count):
+            if _visible_bytes(words[y, k], add, high):
+                top = y
+                break
+        if top >= 0:
+            break
+    
+    if top < 0:
+        return width, -1, 0, 0
+    
+    bottom = top + 1
+    for y in range(height - 1, top, -1):
+        hit = False
+        for k in range(word_count):
+            if _visible_bytes(words[y, k], add, high):
+                hit = True
+                break
+        if hit:
+            bottom = y + 1
+            break
+    
+    left = width
+    right = 0
+    for y in range(top, bottom):
+        for k in range(word_count):
+            if _visible_bytes(words[y, k], add, high):
+                for x in range(k * 8, k * 8 + 8):
+                    if alpha[y, x] > thr:
+                        left = min(left, x)
+                        break
+                break
+        for k in range(word_count - 1, -1, -1):
+            if _visible_bytes(words[y, k], add, high):
+                for x in range(k * 8 + 7, k * 8 - 1, -1):
+                    if alpha[y, x] > thr:
+                        right = max(right, x + 1)
+                        break
+                break
+    
+    return left, top, right, bottom
+
+# None until the first large sprite, then the compiled kernel or False if numba is missing or failed
+_bbox_kernel = None
+
+def _load_bbox_kernel():
+    """
+    Import numba and compile _bbox_scan on first use.
+    Returns the compiled kernel, or None if numpy or numba isn't installed.
+    The kernel is serial; the process pool already provides the parallelism.
+    """
+    global _bbox_kernel, _visible_bytes
+    
+    if _bbox_kernel is None:
+        _bbox_kernel = False
+        if np is not None:
+            try:
+                import numba
+            except ImportError:
+                numba = None
+            
+            if numba is not None:
+                # _bbox_scan picks up the jitted helper from the module globals when it compiles
+                _visible_bytes = numba.njit(inline='always')(_visible_bytes)
+                _bbox_kernel = numba.njit(cache=True, boundscheck=False)(_bbox_scan)
+    
+    return _bbox_kernel or None
+
+def _disable_bbox_kernel():
+    """Stop using the numba kernel in this process, so callers fall back to Pillow."""
+    global _bbox_kernel
+    _bbox_kernel = False
+
+def _kernel_bounding_box(kernel, alpha, alpha_threshold):
+    """Run the compiled bbox kernel on an 'L' alpha image; same result as get_bounding_box."""
+    plane = np.asarray(alpha)
+    height, width = plane.shape
+    if width % 8:
+        # Zero padding is never visible, so it doesn't affect the bounds
+        padded = np.zeros((height, width + (-width % 8)), np.uint8)
+        padded[:, :width] = plane
+        plane = padded
+    
+    add, high = _swar_params(alpha_threshold)
+    left, top, right, bottom = kernel(plane, plane.view(np.uint64), alpha_threshold, add, high)
+    if top < 0:
+        return None
+    return (int(left), int(top), int(right), int(bottom))
+
+# point() tables for each alpha threshold, built once per process
+_LUT_CACHE = {}
+
+def _threshold_lut(alpha_threshold):
+    """Return a 256-entry point() table mapping alpha > alpha_threshold to 255 and the rest to 0."""
+    lut = _LUT_CACHE.get(alpha_threshold)
+    if lut is None:
+        lut = _LUT_CACHE[alpha_threshold] = bytes(255 if v > alpha_threshold else 0 for v in range(256))
+    return lut
+
 def get_bounding_box(image, alpha_threshold=10):
     """
     Get the bounding box of non-transparent pixels in an image.
     Only considers pixels with alpha > threshold as "visible".
     Returns (left, top, right, bottom) or None if image is completely transparent.
     """
-    if image.mode != 'RGBA':
-        # Convert to RGBA if not already
-        image = image.convert('RGBA')
+    # Only the alpha plane is needed, so avoid building a full RGBA copy where possible
+    if 'A' in image.getbands():
+        alpha = image.getchannel('A')
+    elif 'transparency' in image.info:
+        # Palette / colour-key transparency has to be expanded to get an alpha plane
+        alpha = image.convert('RGBA').getchannel('A')
+    else:
+        # No alpha information at all - every pixel is fully opaque
+        return (0, 0, image.width, image.height) if alpha_threshold < 255 else None
     
-    # Get image data as numpy-like array
-    width, height = image.size
-    pixels = list(image.getdata())
+    # A single min/max pass settles fully opaque and fully transparent sprites
+    alpha_min, alpha_max = alpha.getextrema()
+    if alpha_max <= alpha_threshold:
+        return None
+    if alpha_min > alpha_threshold:
+        return (0, 0, image.width, image.height)
     
-    # Find bounds of pixels with alpha > threshold
-    left = width
-    top = height  
+    kernel = None
+    if 0 < alpha_threshold < 255 and alpha.width * alpha.height >= NUMBA_MIN_PIXELS:
+        kernel = _load_bbox_kernel()
+    
+    if kernel is not None:
+        try:
+            return _kernel_bounding_box(kernel, alpha, alpha_threshold)
+        except Exception:
+            # numba compiles on the first call, so typing/compile errors (e.g. an unsupported
+            # numba/numpy pair) show up here - use the Pillow path below from now on
+            _disable_bbox_kernel()
+    
+    if alpha_threshold > 0:
+        # Map visible pixels to 255 and the rest to 0 so getbbox() sees only them
+        alpha = alpha.point(_threshold_lut(alpha_threshold), mode='L')
+    
+    # getbbox() returns the bounds of non-zero pixels (exclusive right/bottom,
+    # same as crop()) or None if there are none
+    return alpha.getbbox()
+
+def get_bounding_box_streamed(path, alpha_threshold=10):
+    """
+    Get the bounding box of non-transparent pixels by decoding the PNG one row at a time.
+    Only a single RGBA row is held in memory, so huge atlases can be scanned without
+    materializing the whole image. The whole file is still inflated, and pypng undoes the
+    row filters in pure Python, so this is several times slower than Pillow - it only
+    saves memory. Requires numpy and pypng.
+    Returns ((width, height), bbox) where bbox is None if the image is completely transparent,
+    or None if pypng can't read the file (callers then fall back to Pillow).
+    """
+    left = None
+    top = None
     right = 0
     bottom = 0
     
-    found_pixel = False
+    try:
+        width, height, rows, info = png.Reader(filename=path).asRGBA8()
+        left = width
+        for y, row in enumerate(rows):
+            visible = np.flatnonzero(np.frombuffer(row, np.uint8)[3::4] > alpha_threshold)
+            if visible.size:
+                if top is None:
+                    top = y
+                bottom = y + 1
+                left = min(left, int(visible[0]))
+                right = max(right, int(visible[-1]) + 1)
+    except Exception:
+        # pypng is stricter than Pillow (e.g. about short palettes)
+        return None
     
-    for y in range(height):
-        for x in range(width):
-            pixel_index = y * width + x
-            r, g, b, a = pixels[pixel_index]
-            
-            if a > alpha_threshold:  # Pixel is visible enough
-                found_pixel = True
-                left = min(left, x)
-                right = max(right, x + 1)  # +1 because crop uses exclusive right/bottom
-                top = min(top, y)
-                bottom = max(bottom, y + 1)  # +1 because crop uses exclusive right/bottom
-    
-    if not found_pixel:
+    if top is None:
+        return (width, height), None
+    
+    return (width, height), (left, top, right, bottom)
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+def _read_png_header(path):
+    """
+    Read just enough of a PNG to tell whether it can contain transparent pixels.
+    Walks the chunk headers up to the first IDAT (tRNS must come before it) without decoding pixels.
+    Returns ((width, height), has_alpha) or None if the file isn't a readable PNG.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if f.read(8) != PNG_SIGNATURE:
+                return None
+            
+            length, chunk_type = struct.unpack('>I4s', f.read(8))
+            if chunk_type != b'IHDR' or length < 13:
+                return None
+            
+            ihdr = f.read(length + 4)  # data + CRC
+            width, height = struct.unpack('>II', ihdr[:8])
+            color_type = ihdr[9]
+            
+            # Color types 4 and 6 (gray + alpha, RGBA) carry a full alpha channel
+            if color_type in (4, 6):
+                return (width, height), True
+            
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    return None
+                length, chunk_type = struct.unpack('>I4s', header)
+                if chunk_type == b'tRNS':
+                    return (width, height), True
+                if chunk_type == b'IDAT':
+                    return (width, height), False
+                f.seek(length + 4, os.SEEK_CUR)
+    except (OSError, struct.error):
         return None
+
+def scan_sprite(path, alpha_threshold=10, stream=False):
+    """
+    Find a sprite's size and bounding box as cheaply as possible for read-only analysis.
+    Opaque PNGs are answered from the header alone; with stream=True the rest are scanned
+    row by row, otherwise they are decoded with Pillow.
+    Returns ((width, height), bbox) where bbox is None if the image is completely transparent.
+    """
+    if alpha_threshold < 255:
+        header = _read_png_header(path)
+        if header is not None and not header[1]:
+            # No alpha channel or tRNS chunk, so every pixel is fully opaque
+            return header[0], (0, 0) + header[0]
+    
+    if stream:
+        streamed = get_bounding_box_streamed(path, alpha_threshold)
+        if streamed is not None:
+            return streamed
+    
+    with Image.open(path) as img:
+        return img.size, get_bounding_box(img, alpha_threshold)
+
+def png_save_options(fast_save=False):
+    """
+    Keyword arguments for saving cropped PNGs.
+    optimize=True tries every filter at maximum zlib compression; fast_save uses
+    Pillow's default level 6 instead, which is several times faster for slightly larger files.
+    """
+    if fast_save:
+        return {'format': 'PNG', 'compress_level': 6}
+    return {'format': 'PNG', 'optimize': True}
+
+def get_tile_bounding_boxes(image, tile_size, alpha_threshold=10):
+    """
+    Get the bounding box of non-transparent pixels in every tile of a sprite sheet.
+    Tiles are numbered left to right, top to bottom; partial tiles at the right/bottom edge are ignored.
+    Returns a list of (left, top, right, bottom) relative to each tile, or None for empty tiles.
+    """
+    if image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    
+    tile_width, tile_height = tile_size
+    rows = image.height // tile_height
+    cols = image.width // tile_width
+    
+    # Threshold the whole sheet at once, then regroup into (tile, y, x)
+    mask = np.asarray(image.getchannel('A'))[:rows * tile_height, :cols * tile_width] > alpha_threshold
+    tiles = mask.reshape(rows, tile_height, cols, tile_width).transpose(0, 2, 1, 3).reshape(rows * cols, tile_height, tile_width)
+    
+    any_row = tiles.any(axis=2)
+    any_col = tiles.any(axis=1)
+    visible = any_row.any(axis=1)
+    
+    top = any_row.argmax(axis=1)
+    bottom = tile_height - any_row[:, ::-1].argmax(axis=1)
+    left = any_col.argmax(axis=1)
+    right = tile_width - any_col[:, ::-1].argmax(axis=1)
+    
+    return [
+        (int(left[i]), int(top[i]), int(right[i]), int(bottom[i])) if visible[i] else None
+        for i in range(rows * cols)
+    ]
+
+def crop_tiles(input_path, tile_size, output_dir, alpha_threshold=10, preview=False, fast_save=False):
+    """
+    Split a sprite sheet into tiles and save each tile cropped to its visible pixels.
+    
+    Args:
+        input_path (str): Path to the sprite sheet
+        tile_size (tuple): (width, height) of a single tile
+        output_dir (str): Directory for the tiles, saved as <sheet>_<index>.png
+        alpha_threshold (int): Alpha threshold for considering pixels visible
+        preview (bool): Only report what would be written
+        fast_save (bool): Save with faster, lighter PNG compression
+    
+    Returns:
+        tuple: (success, message, (tile_count, cropped_count))
+    """
+    try:
+        with Image.open(input_path) as img:
+            rgba = img if img.mode == 'RGBA' else img.convert('RGBA')
+            tile_width, tile_height = tile_size
+            cols = rgba.width // tile_width
+            
+            bboxes = get_tile_bounding_boxes(rgba, tile_size, alpha_threshold)
+            if not bboxes:
+                return False, f"Sheet is smaller than one {tile_width}x{tile_height} tile: {input_path}", (0, 0)
+            
+            cropped_count = sum(1 for bbox in bboxes if bbox is not None)
+            if preview:
+                return True, f"Would split: {input_path} | {len(bboxes)} tiles -> {cropped_count} non-empty", (len(bboxes), cropped_count)
+            
+            os.makedirs(output_dir, exist_ok=True)
+            stem = Path(input_path).stem
+            
+            for index, bbox in enumerate(bboxes):
+                if bbox is None:
+                    continue
+                
+                # Offset the tile-relative bbox to sheet coordinates
+                x = (index % cols) * tile_width
+                y = (index // cols) * tile_height
+                left, top, right, bottom = bbox
+                tile = rgba.crop((x + left, y + top, x + right, y + bottom))
+                tile.save(os.path.join(output_dir, f"{stem}_{index:03d}.png"), **png_save_options(fast_save))
+            
+            return True, f"Split: {input_path} | {len(bboxes)} tiles -> {cropped_count} saved to {output_dir}", (len(bboxes), cropped_count)
+            
+    except Exception as e:
+        return False, f"Error splitting {input_path}: {str(e)}", (0, 0)
+
+def load_bbox_cache(cache_path=CACHE_FILE):
+    """Load the bounding box cache from a previous run (empty if missing, unreadable or not a cache)."""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    
+    return cache if isinstance(cache, dict) else {}
+
+def save_bbox_cache(cache, cache_path=CACHE_FILE):
+    """Write the bounding box cache, replacing the old file atomically."""
+    temp_path = cache_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(temp_path, cache_path)
+
+def lookup_cached_bbox(cache, path, alpha_threshold):
+    """
+    Look up the cached bounding box of a sprite.
+    Entries are keyed by absolute path and only valid while the file's mtime and size are unchanged.
+    Returns (image_size, bbox) on a hit (bbox is None for transparent images) or None on a miss.
+    Malformed entries and files that can't be statted count as misses.
+    """
+    entry = cache.get(os.path.abspath(path))
+    if not isinstance(entry, dict):
+        return None
+    
+    try:
+        if entry['alpha_threshold'] != alpha_threshold:
+            return None
         
-    return (left, top, right, bottom)
+        stat = os.stat(path)
+        if entry['mtime_ns'] != stat.st_mtime_ns or entry['size'] != stat.st_size:
+            return None
+        
+        image_size = tuple(entry['image_size'])
+        bbox = tuple(entry['bbox']) if entry['bbox'] is not None else None
+    except (OSError, KeyError, TypeError):
+        return None
+    
+    if len(image_size) != 2 or (bbox is not None and len(bbox) != 4):
+        return None
+    
+    return image_size, bbox
+
+def store_cached_bbox(cache, path, alpha_threshold, image_size, bbox):
+    """Record the bounding box of a sprite against its current mtime and size (skipped if it can't be statted)."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return
+    
+    cache[os.path.abspath(path)] = {
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'alpha_threshold': alpha_threshold,
+        'image_size': list(image_size),
+        'bbox': list(bbox) if bbox is not None else None,
+    }
 
-def crop_sprite(input_path, output_path=None, backup=True, alpha_threshold=10):
+def crop_sprite(input_path, output_path=None, backup=True, alpha_threshold=10, cached=None, fast_save=False, stream=False):
     """
     Crop a single sprite image to remove transparent borders.
     
@@ -58,29 +480,50 @@ def crop_sprite(input_path, output_path=None, backup=True, alpha_threshold=10):
         output_path (str): Path for output image (defaults to overwrite input)
         backup (bool): Whether to create backup of original
         alpha_threshold (int): Alpha threshold for considering pixels visible
+        cached (tuple): (image_size, bbox) from the bbox cache, skips the scan (and the
+            decode when no crop is needed)
+        fast_save (bool): Save with faster, lighter PNG compression
+        stream (bool): Find the bbox with a row-by-row scan first, so the full-size image
+            is only built when there is something to crop (slower, see get_bounding_box_streamed)
     
     Returns:
-        tuple: (success, message, (original_size, new_size))
+        tuple: (success, message, (original_size, new_size), bbox)
     """
     try:
+        if cached is None and stream:
+            cached = get_bounding_box_streamed(input_path, alpha_threshold)
+        
+        if cached is not None:
+            original_size, bbox = cached
+            
+            if bbox is None:
+                return False, f"Image is completely transparent: {input_path}", (original_size, original_size), None
+            
+            if bbox == (0, 0) + original_size:
+                return True, f"No cropping needed: {input_path}", (original_size, original_size), bbox
+        
         # Open the image
         with Image.open(input_path) as img:
             original_size = img.size
             
-            # Get bounding box of non-transparent pixels
-            bbox = get_bounding_box(img, alpha_threshold)
+            # Get bounding box of non-transparent pixels (reads just the alpha information,
+            # so opaque RGB/palette sprites are settled without any conversion)
+            if cached is None:
+                bbox = get_bounding_box(img, alpha_threshold)
             
             if bbox is None:
-                return False, f"Image is completely transparent: {input_path}", (original_size, original_size)
+                return False, f"Image is completely transparent: {input_path}", (original_size, original_size), None
             
             left, top, right, bottom = bbox
             
             # Check if cropping is needed
             if left == 0 and top == 0 and right == img.width and bottom == img.height:
-                return True, f"No cropping needed: {input_path}", (original_size, original_size)
+                return True, f"No cropping needed: {input_path}", (original_size, original_size), bbox
             
-            # Crop the image
+            # Crop the image, converting only the cropped region to RGBA
             cropped = img.crop(bbox)
+            if cropped.mode != 'RGBA':
+                cropped = cropped.convert('RGBA')
             new_size = cropped.size
             
             # Determine output path
@@ -89,29 +532,51 @@ def crop_sprite(input_path, output_path=None, backup=True, alpha_threshold=10):
                 
                 # Create backup if requested
                 if backup:
-                    backup_path = input_path.replace('.png', '_original.png')
+                    source = Path(input_path)
+                    backup_path = source.with_name(f"{source.stem}_original{source.suffix}")
                     if not os.path.exists(backup_path):
                         img.save(backup_path)
             
-            # Save cropped image
-            cropped.save(output_path, 'PNG', optimize=True)
-            
-            saved_pixels = (original_size[0] * original_size[1]) - (new_size[0] * new_size[1])
-            percentage_saved = (saved_pixels / (original_size[0] * original_size[1])) * 100
-            
-            return True, f"Cropped: {input_path} | {original_size} -> {new_size} | {percentage_saved:.1f}% pixels saved", (original_size, new_size)
-            
+            # Leaving the with block only closes the file, so release the decoded
+            # source explicitly before the encoder allocates its own buffers
+            img.close()
+        
+        # Save cropped image
+        cropped.save(output_path, **png_save_options(fast_save))
+        
+        saved_pixels = (original_size[0] * original_size[1]) - (new_size[0] * new_size[1])
+        percentage_saved = (saved_pixels / (original_size[0] * original_size[1])) * 100
+        
+        return True, f"Cropped: {input_path} | {original_size} -> {new_size} | {percentage_saved:.1f}% pixels saved", (original_size, new_size), bbox
+        
     except Exception as e:
-        return False, f"Error processing {input_path}: {str(e)}", (None, None)
+        return False, f"Error processing {input_path}: {str(e)}", (None, None), None
 
-def find_sprite_files(directory):
-    """Find all PNG files in the directory and subdirectories."""
-    sprite_files = []
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.lower().endswith('.png') and not file.endswith('_original.png'):
-                sprite_files.append(os.path.join(root, file))
-    return sprite_files
+def iter_sprite_files(directory, exclude=()):
+    """
+    Yield PNG files in the directory and subdirectories, skipping '_original' backups.
+    Symlinks are not followed, neither to directories nor to files.
+    Directories in exclude (real paths, e.g. the output directory) are not entered.
+    """
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        # Unreadable directories are skipped, like os.walk does
+        return
+    
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if not exclude or os.path.realpath(entry.path) not in exclude:
+                    yield from iter_sprite_files(entry.path, exclude)
+            elif entry.is_file(follow_symlinks=False):
+                name = entry.name.lower()
+                if name.endswith('.png') and not name.endswith('_original.png'):
+                    yield entry.path
+
+def find_sprite_files(directory, exclude=()):
+    """Find all PNG files in the directory and subdirectories, except under the excluded directories."""
+    return list(iter_sprite_files(directory, {os.path.realpath(path) for path in exclude}))
 
 def test_crop(input_path):
     """Test function to verify cropping removes ALL transparent borders."""
@@ -136,6 +601,48 @@ def test_crop(input_path):
     except Exception as e:
         print(f"✗ Error testing {input_path}: {e}")
 
+class BufferedOutput:
+    """Collect per-file status lines and write them to stdout in batches instead of one write per line."""
+    
+    def __init__(self, batch_size=OUTPUT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.lines = []
+    
+    def write(self, line):
+        self.lines.append(line)
+        if len(self.lines) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        if self.lines:
+            sys.stdout.write("\n".join(self.lines) + "\n")
+            sys.stdout.flush()
+            self.lines.clear()
+
+def positive_int(value):
+    """argparse type for options like --jobs that need an integer >= 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected an integer, got '{value}'")
+    
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be positive, got '{value}'")
+    
+    return number
+
+def parse_tile_size(value):
+    """Parse a --tile value like '32x48' into (width, height)."""
+    try:
+        width, height = (int(part) for part in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got '{value}'")
+    
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"tile size must be positive, got '{value}'")
+    
+    return width, height
+
 def main():
     parser = argparse.ArgumentParser(description='Crop transparent borders from game sprites')
     parser.add_argument('path', nargs='?', default='assets', 
@@ -150,21 +657,42 @@ def main():
                        help='Test mode - analyze transparent borders in detail')
     parser.add_argument('--alpha-threshold', type=int, default=10,
                        help='Alpha threshold for considering pixels visible (default: 10)')
+    parser.add_argument('--jobs', '-j', type=positive_int,
+                       help='Number of worker processes for cropping (default: CPU count)')
+    parser.add_argument('--no-cache', action='store_true',
+                       help=f'Don\'t read or update the bounding box cache ({CACHE_FILE})')
+    parser.add_argument('--fast-save', action='store_true',
+                       help='Save PNGs with zlib level 6 instead of optimize (faster, slightly larger files)')
+    parser.add_argument('--stream', action='store_true',
+                       help='Scan PNGs row by row to find their bounds - slower, but uses far less memory on huge atlases (needs pypng)')
+    parser.add_argument('--tile', type=parse_tile_size, metavar='WxH',
+                       help='Treat images as sprite sheets of WxH tiles and save each tile cropped to <output-dir>/<name>_tiles/ (requires --output-dir)')
     
     args = parser.parse_args()
     
     # Check if PIL is available
-    try:
-        from PIL import Image, ImageChops
-    except ImportError:
+    if Image is None:
         print("Error: PIL (Pillow) is required. Install with: pip install Pillow")
         return 1
     
+    if args.tile and np is None:
+        print("Error: numpy is required for --tile. Install with: pip install numpy")
+        return 1
+    
+    if args.tile and not args.output_dir:
+        print("Error: --tile requires --output-dir, so the tiles don't end up in the source tree")
+        return 1
+    
+    if args.stream and (png is None or np is None):
+        print("Error: numpy and pypng are required for --stream. Install with: pip install numpy pypng")
+        return 1
+    
     # Determine what to process
     if os.path.isfile(args.path):
         sprite_files = [args.path]
     elif os.path.isdir(args.path):
-        sprite_files = find_sprite_files(args.path)
+        # Don't pick up earlier results when the output directory is inside the scanned tree
+        sprite_files = find_sprite_files(args.path, [args.output_dir] if args.output_dir else [])
     else:
         print(f"Error: Path '{args.path}' does not exist")
         return 1
@@ -176,63 +704,123 @@ def main():
     print(f"Found {len(sprite_files)} sprite files to process...")
     print("-" * 60)
     
+    # Only preview and crop mode read the cache, so --test and --tile leave it alone
+    use_cache = not (args.no_cache or args.test or args.tile)
+    cache = load_bbox_cache() if use_cache else None
+    output = BufferedOutput()
+    
     total_processed = 0
     total_success = 0
     total_pixels_saved = 0
     total_files_changed = 0
+    total_tiles = 0
     
-    for sprite_file in sprite_files:
-        if args.test:
-            # Test mode - detailed analysis
-            test_crop(sprite_file)
-        elif args.preview:
-            # Preview mode - just analyze without changing
-            try:
-                with Image.open(sprite_file) as img:
-                    bbox = get_bounding_box(img, args.alpha_threshold)
+    if args.tile:
+        # Sprite sheet mode - split every sheet into cropped tiles
+        root = args.path if os.path.isdir(args.path) else os.path.dirname(args.path)
+        for sprite_file in sprite_files:
+            rel_dir = os.path.relpath(os.path.abspath(os.path.dirname(sprite_file)), os.path.abspath(root))
+            output_dir = os.path.normpath(os.path.join(args.output_dir, rel_dir, Path(sprite_file).stem + '_tiles'))
+            
+            success, message, (tile_count, cropped_count) = crop_tiles(sprite_file, args.tile, output_dir, args.alpha_threshold, args.preview, args.fast_save)
+            
+            if success:
+                output.write(f"✓ {message}")
+                total_success += 1
+                total_tiles += tile_count
+                total_files_changed += cropped_count
+            else:
+                output.write(f"✗ {message}")
+            
+            total_processed += 1
+    elif args.test or args.preview:
+        for sprite_file in sprite_files:
+            if args.test:
+                # Test mode - detailed analysis
+                test_crop(sprite_file)
+            elif args.preview:
+                # Preview mode - just analyze without changing
+                try:
+                    cached = lookup_cached_bbox(cache, sprite_file, args.alpha_threshold) if cache is not None else None
+                    if cached is not None:
+                        original_size, bbox = cached
+                    else:
+                        original_size, bbox = scan_sprite(sprite_file, args.alpha_threshold, args.stream)
+                        if cache is not None:
+                            store_cached_bbox(cache, sprite_file, args.alpha_threshold, original_size, bbox)
+                    
                     if bbox:
                         left, top, right, bottom = bbox
-                        original_size = img.size
+                        width, height = original_size
                         new_size = (right - left, bottom - top)
                         
-                        if left == 0 and top == 0 and right == img.width and bottom == img.height:
-                            print(f"✓ No crop needed: {sprite_file}")
+                        if left == 0 and top == 0 and right == width and bottom == height:
+                            output.write(f"✓ No crop needed: {sprite_file}")
                         else:
                             saved_pixels = (original_size[0] * original_size[1]) - (new_size[0] * new_size[1])
                             percentage_saved = (saved_pixels / (original_size[0] * original_size[1])) * 100
-                            print(f"➤ Would crop: {sprite_file} | {original_size} -> {new_size} | {percentage_saved:.1f}% pixels")
-                            print(f"  Borders: L={left}px T={top}px R={img.width-right}px B={img.height-bottom}px")
+                            output.write(f"➤ Would crop: {sprite_file} | {original_size} -> {new_size} | {percentage_saved:.1f}% pixels")
+                            output.write(f"  Borders: L={left}px T={top}px R={width-right}px B={height-bottom}px")
                             total_files_changed += 1
                             total_pixels_saved += saved_pixels
                     else:
-                        print(f"⚠ Completely transparent: {sprite_file}")
-            except Exception as e:
-                print(f"✗ Error analyzing {sprite_file}: {e}")
-        else:
-            # Actual processing
-            output_path = None
-            if args.output_dir:
-                # Create output directory structure
-                rel_path = os.path.relpath(sprite_file, args.path if os.path.isdir(args.path) else os.path.dirname(args.path))
-                output_path = os.path.join(args.output_dir, rel_path)
-                os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-            success, message, sizes = crop_sprite(sprite_file, output_path, not args.no_backup, args.alpha_threshold)
+                        output.write(f"⚠ Completely transparent: {sprite_file}")
+                except Exception as e:
+                    output.write(f"✗ Error analyzing {sprite_file}: {e}")
             
-            if success:
-                print(f"✓ {message}")
-                total_success += 1
-                if sizes[0] and sizes[1] and sizes[0] != sizes[1]:
-                    total_files_changed += 1
-                    saved_pixels = (sizes[0][0] * sizes[0][1]) - (sizes[1][0] * sizes[1][1])
-                    total_pixels_saved += saved_pixels
-            else:
-                print(f"✗ {message}")
-        
-        total_processed += 1
+            total_processed += 1
+    else:
+        # Actual processing - sprites are independent, so spread them over worker processes
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            futures = {}
+            for sprite_file in sprite_files:
+                output_path = None
+                if args.output_dir:
+                    # Create output directory structure
+                    rel_path = os.path.relpath(sprite_file, args.path if os.path.isdir(args.path) else os.path.dirname(args.path))
+                    output_path = os.path.join(args.output_dir, rel_path)
+                    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                
+                cached = lookup_cached_bbox(cache, sprite_file, args.alpha_threshold) if cache is not None else None
+                future = executor.submit(crop_sprite, sprite_file, output_path, not args.no_backup, args.alpha_threshold, cached, args.fast_save, args.stream)
+                futures[future] = (sprite_file, output_path)
+            
+            for future in as_completed(futures):
+                success, message, sizes, bbox = future.result()
+                sprite_file, output_path = futures[future]
+                
+                if cache is not None and sizes[0] is not None:
+                    if output_path is None and sizes[0] != sizes[1]:
+                        # Cropped in place - the file on disk now fills its whole bbox
+                        store_cached_bbox(cache, sprite_file, args.alpha_threshold, sizes[1], (0, 0) + sizes[1])
+                    else:
+                        store_cached_bbox(cache, sprite_file, args.alpha_threshold, sizes[0], bbox)
+                
+                if success:
+                    output.write(f"✓ {message}")
+                    total_success += 1
+                    if sizes[0] and sizes[1] and sizes[0] != sizes[1]:
+                        total_files_changed += 1
+                        saved_pixels = (sizes[0][0] * sizes[0][1]) - (sizes[1][0] * sizes[1][1])
+                        total_pixels_saved += saved_pixels
+                else:
+                    output.write(f"✗ {message}")
+                
+                total_processed += 1
+    
+    output.flush()
+    
+    if cache is not None:
+        save_bbox_cache(cache)
     
     print("-" * 60)
-    if args.preview:
+    if args.tile:
+        print(f"Tile Summary:")
+        print(f"  Sheets processed: {total_processed}")
+        print(f"  Sheets successfully processed: {total_success}")
+        print(f"  Tiles found: {total_tiles}")
+        print(f"  Tiles {'that would be saved' if args.preview else 'saved'}: {total_files_changed}")
+    elif args.preview:
         print(f"Preview Summary:")
         print(f"  Files analyzed: {total_processed}")
         print(f"  Files that would be cropped: {total_files_changed}")